@@ -1,8 +1,17 @@
-import json
-import re
+try:
+    # volitelně google-re2 (DFA, rychlejší řádkové scany); vzory níže
+    # nepoužívají backreference, takže jsou plně RE2-kompatibilní –
+    # oficiální wrapper ale nemusí mít stdlib-style API (flagy, compile),
+    # tak si ho rovnou vyzkoušíme a případně spadneme na stdlib re
+    import re2 as re
+    re.compile("x", re.IGNORECASE)
+except (ImportError, AttributeError, TypeError):
+    import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-import pdfplumber
+import fitz  # PyMuPDF
+import orjson
 
 # Konfigurace sad – jména musí sedět s tvými soubory
 SETS = [
@@ -15,16 +24,28 @@ SETS = [
 QUESTION_HEADER_RE = re.compile(r"Otázka\s+(\d+)\s+\(1 bod\)")
 ANSWER_LINE_RE = re.compile(r"^([abcd])\)\s*(.+)")
 KEY_ROW_RE = re.compile(r"^(\d+)\s+([abcd])\b")
+# samostatná buňka s písmenem odpovědi, např. "c" nebo "a, e"
+KEY_LETTER_RE = re.compile(r"^([abcd])(\s*,\s*[a-e])*\s*$")
+
+LETTER_TO_IDX = {"a": 0, "b": 1, "c": 2, "d": 3}
+
+CACHE_DIR = Path(".pdf_text_cache")
 
 
 def extract_text(pdf_path: Path) -> str:
-    with pdfplumber.open(pdf_path) as pdf:
-        texts = []
-        for page in pdf.pages:
-            t = page.extract_text()
-            if t:
-                texts.append(t)
-        return "\n".join(texts)
+    # cache vytaženého textu podle mtime+velikosti PDF, ať se při opakovaném
+    # běhu nemusí parsovat znovu
+    stat = pdf_path.stat()
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_path = CACHE_DIR / f"{pdf_path.name}.{stat.st_mtime_ns}.{stat.st_size}.txt"
+    if cache_path.exists():
+        return cache_path.read_text(encoding="utf-8")
+
+    with fitz.open(pdf_path) as doc:
+        text = "\n".join(page.get_text("text") for page in doc)
+
+    cache_path.write_text(text, encoding="utf-8")
+    return text
 
 
 def strip_footer_cs(text: str) -> str:
@@ -35,6 +56,7 @@ def strip_footer_cs(text: str) -> str:
         "© International Software Testing Qualifications Board",
         "Vydáno 1.4.2025",
         "Vzorová zkouška, sada",
+        "Certifikovaný tester",
     ]
     for marker in markers:
         idx = text.find(marker)
@@ -49,38 +71,43 @@ def parse_questions(text: str):
     Vrátí dict: { číslo_otázky: { 'question': text, 'options': [a,b,c,d] } }
     """
     result = {}
-    # rozsekáme text podle hlavičky "Otázka X (1 bod)"
-    parts = QUESTION_HEADER_RE.split(text)
-    # parts[0] = úvod, pak se střídá: číslo, blok, číslo, blok, ...
-    for i in range(1, len(parts), 2):
-        q_number = int(parts[i])
-        block = parts[i + 1]
-
-        lines = [l.strip() for l in block.splitlines() if l.strip()]
+    # najdeme hlavičky "Otázka X (1 bod)" a bloky vyřezáváme podle jejich
+    # pozic – na rozdíl od re.split se nedrží všechny bloky v paměti naráz
+    matches = list(QUESTION_HEADER_RE.finditer(text))
+    for i, m in enumerate(matches):
+        q_number = int(m.group(1))
+        start = m.end()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        block = text[start:end]
+
+        # split+join zároveň ořeže okraje a srazí vícenásobné mezery,
+        # které PyMuPDF na rozdíl od pdfplumberu nechává v textu
+        lines = [s for l in block.splitlines() if (s := " ".join(l.split()))]
         question_lines = []
-        option_map = {}  # 'a' -> text, ...
+        option_map = {}  # 'a' -> [řádky textu], spojíme až na konci
 
         mode = "question"
+        last_key = None
         for line in lines:
             m = ANSWER_LINE_RE.match(line)
             if m:
                 mode = "answers"
                 letter, txt = m.groups()
-                option_map[letter] = txt.strip()
+                last_key = letter
+                option_map[last_key] = [txt.strip()]
             else:
                 if mode == "question":
                     question_lines.append(line)
                 else:
                     # pokračování předchozí odpovědi (zalomení řádku)
-                    if option_map:
-                        last_key = sorted(option_map.keys())[-1]
-                        option_map[last_key] += " " + line.strip()
+                    if last_key is not None:
+                        option_map[last_key].append(line.strip())
 
         if len(option_map) < 4:
             print(f"Varování: otázka {q_number} nemá 4 odpovědi, našel jsem: {list(option_map.keys())}")
 
         question_text = " ".join(question_lines).strip()
-        options = [option_map.get(ch, "") for ch in "abcd"]
+        options = [" ".join(option_map.get(ch, [])) for ch in "abcd"]
 
         # nejdřív přesuneme "Vyberte..." z poslední odpovědi do otázky
         question_text, options = move_instruction_from_last_option_to_question(question_text, options)
@@ -108,13 +135,31 @@ def parse_answer_key(text: str):
         text = text[idx:]
 
     key = {}
+    pending_num = None
     for line in text.splitlines():
         line = line.strip()
-        m = KEY_ROW_RE.match(line)
-        if m:
-            q_num = int(m.group(1))
-            letter = m.group(2).lower()
-            key[q_num] = letter
+        if not line:
+            continue
+        if line[0].isdigit():
+            # celá řádka tabulky na jednom řádku, např. "1 c"
+            m = KEY_ROW_RE.match(line)
+            if m:
+                key.setdefault(int(m.group(1)), m.group(2).lower())
+                pending_num = None
+            elif line.isdigit():
+                # PyMuPDF vypisuje tabulku po buňkách – číslo otázky a
+                # písmeno odpovědi přijdou na samostatných řádcích
+                pending_num = int(line)
+            else:
+                pending_num = None
+            continue
+        # buňka s písmenem hned za buňkou s číslem otázky; setdefault
+        # zajistí, že pozdější náhodné páry v textu odpovědí nic nepřepíšou
+        if pending_num is not None:
+            m = KEY_LETTER_RE.match(line)
+            if m:
+                key.setdefault(pending_num, m.group(1).lower())
+        pending_num = None
     return key
 
 
@@ -151,43 +196,53 @@ def move_instruction_from_last_option_to_question(question_text: str, options: l
 
 
 
-def main():
-    all_questions = []
+def process_set(set_tuple):
+    """Zpracuje jednu sadu (PDF s otázkami + klíčem) a vrátí seznam otázek."""
+    set_id, q_pdf, a_pdf = set_tuple
+    q_path = Path(q_pdf)
+    a_path = Path(a_pdf)
+
+    print(f"Zpracovávám sadu {set_id}...")
+
+    q_text = extract_text(q_path)
+    a_text = extract_text(a_path)
 
-    for set_id, q_pdf, a_pdf in SETS:
-        q_path = Path(q_pdf)
-        a_path = Path(a_pdf)
+    questions = parse_questions(q_text)
+    answer_key = parse_answer_key(a_text)
 
-        print(f"Zpracovávám sadu {set_id}...")
+    set_questions = []
+    for q_num, q_data in questions.items():
+        if q_num not in answer_key:
+            print(f"  ⚠️  Nemám správnou odpověď pro otázku {q_num} v sadě {set_id}")
+            continue
 
-        q_text = extract_text(q_path)
-        a_text = extract_text(a_path)
+        letter = answer_key[q_num]
+        correct_index = LETTER_TO_IDX[letter]
 
-        questions = parse_questions(q_text)
-        answer_key = parse_answer_key(a_text)
+        set_questions.append(
+            {
+                "set": set_id,
+                "id": q_num,
+                "language": "cs",
+                "question": q_data["question"],
+                "options": q_data["options"],
+                "correct_index": correct_index,
+            }
+        )
 
-        for q_num, q_data in questions.items():
-            if q_num not in answer_key:
-                print(f"  ⚠️  Nemám správnou odpověď pro otázku {q_num} v sadě {set_id}")
-                continue
+    return set_questions
 
-            letter = answer_key[q_num]
-            correct_index = "abcd".index(letter)
 
-            all_questions.append(
-                {
-                    "set": set_id,
-                    "id": q_num,
-                    "language": "cs",
-                    "question": q_data["question"],
-                    "options": q_data["options"],
-                    "correct_index": correct_index,
-                }
-            )
+def main():
+    all_questions = []
+
+    # sady jsou na sobě nezávislé, takže je zpracujeme paralelně
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        for set_questions in executor.map(process_set, SETS):
+            all_questions.extend(set_questions)
 
     out_path = Path("questions_cs.json")
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(all_questions, f, ensure_ascii=False, indent=2)
+    out_path.write_bytes(orjson.dumps(all_questions, option=orjson.OPT_INDENT_2))
 
     print(f"Hotovo, uloženo do {out_path.resolve()}")
 
@@ -1,8 +1,12 @@
 import json
+import os
 import time
 import random
+from itertools import groupby
 from pathlib import Path
 
+import numpy as np
+import orjson
 import streamlit as st
 
 # Mapování jazyk -> soubor s otázkami
@@ -15,7 +19,7 @@ STATS_FILE = "stats.json"
 
 
 @st.cache_data
-def load_questions(file_name: str):
+def load_questions(file_name: str, language: str):
     path = Path(file_name)
     if not path.exists():
         return {}
@@ -23,78 +27,108 @@ def load_questions(file_name: str):
     with path.open("r", encoding="utf-8") as f:
         data = json.load(f)
 
-    sets = {}
-    for q in data:
-        s = q["set"]
-        sets.setdefault(s, []).append(q)
+    # jeden sort přes všechno a pak C-implementovaný groupby místo
+    # ručního rozhazování do dictu a řazení každé sady zvlášť
+    data.sort(key=lambda q: (q["set"], q.get("id", 0)))
+    sets = {k: list(g) for k, g in groupby(data, key=lambda q: q["set"])}
 
-    for s in sets:
-        sets[s] = sorted(sets[s], key=lambda x: x.get("id", 0))
+    # klíče do statistik a session_state si předpočítáme jednou tady,
+    # ať je horká smyčka při každém rerunu nestaví znovu
+    for qs in sets.values():
+        for q in qs:
+            q["_stat_key"] = f"{language}:{q['set']}:{q['id']}"
+            q["_qid_tuple"] = (q["set"], q["id"], language)
 
     return sets
 
 
+def _migrate_legacy_stats(stats: dict) -> dict:
+    """Převede starý tvar {user: {"questions": {key: {seen, correct}}}}
+    na ploché {user: {"seen": {key: int}, "correct": {key: int}}}."""
+    for user_stats in stats.values():
+        questions = user_stats.pop("questions", None)
+        if questions is None:
+            user_stats.setdefault("seen", {})
+            user_stats.setdefault("correct", {})
+            continue
+        seen = {}
+        correct = {}
+        for key, rec in questions.items():
+            seen[key] = rec.get("seen", 0)
+            correct[key] = rec.get("correct", 0)
+        user_stats["seen"] = seen
+        user_stats["correct"] = correct
+    return stats
+
+
+@st.cache_data
+def _read_stats_file(mtime_ns: int) -> dict:
+    # mtime_ns je tu jen jako klíč cache – po přepsání souboru se změní
+    # a cache se tím sama invaliduje
+    with Path(STATS_FILE).open("r", encoding="utf-8") as f:
+        return _migrate_legacy_stats(json.load(f))
+
+
 def load_stats() -> dict:
     path = Path(STATS_FILE)
     if not path.exists():
         return {}
     try:
-        with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return _read_stats_file(path.stat().st_mtime_ns)
     except Exception:
         return {}
 
 
 def save_stats(stats: dict) -> None:
+    # orjson serializuje rovnou do bytes a je výrazně rychlejší než
+    # json.dump s indent=2; zapisujeme atomicky přes temp soubor + rename,
+    # ať souběžné session nikdy nevidí napůl zapsaný stats.json
     path = Path(STATS_FILE)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_bytes(orjson.dumps(stats, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_path, path)
 
 
 def update_stats_for_run(questions):
     """Aktualizuje stats.json pro právě dokončený test."""
     username = st.session_state.username
-    language = st.session_state.language
 
     stats = load_stats()
-    user_stats = stats.setdefault(username, {"questions": {}})
-    q_stats = user_stats["questions"]
+    user_stats = stats.setdefault(username, {"seen": {}, "correct": {}})
+    seen_map = user_stats["seen"]
+    correct_map = user_stats["correct"]
 
     for q in questions:
-        key = f"{language}:{q['set']}:{q['id']}"
-        rec = q_stats.setdefault(key, {"seen": 0, "correct": 0})
-        rec["seen"] += 1
+        key = q["_stat_key"]
+        seen_map[key] = seen_map.get(key, 0) + 1
+        correct_map.setdefault(key, 0)
 
-        qid = (q["set"], q["id"], language)
-        user_answer_index = st.session_state.answers.get(qid, None)
+        user_answer_index = st.session_state.answers.get(q["_qid_tuple"], None)
         if user_answer_index == q["correct_index"]:
-            rec["correct"] += 1
+            correct_map[key] += 1
 
     save_stats(stats)
 
 
 def get_questions_for_mode(sets, selected_set, practice_mode):
     """Vrátí seznam otázek podle zvoleného režimu tréninku."""
-    language = st.session_state.language
     username = st.session_state.username
 
     questions = sets[selected_set]
 
     if practice_mode == "Targeted (slabé otázky)":
         stats = load_stats()
-        user_stats = stats.get(username, {}).get("questions", {})
+        user_stats = stats.get(username, {})
+        seen_map = user_stats.get("seen", {})
+        correct_map = user_stats.get("correct", {})
 
         weak_questions = []
         for q in questions:
-            key = f"{language}:{q['set']}:{q['id']}"
-            rec = user_stats.get(key)
-            if not rec:
-                continue
-            seen = rec.get("seen", 0)
-            correct = rec.get("correct", 0)
+            key = q["_stat_key"]
+            seen = seen_map.get(key, 0)
             if seen == 0:
                 continue
-            success_rate = correct / seen
+            success_rate = correct_map.get(key, 0) / seen
             if success_rate < 0.7:
                 weak_questions.append(q)
 
@@ -125,6 +159,7 @@ def init_state(selected_set, language, shuffle_questions, shuffle_options, usern
     st.session_state.current_index = 0
     st.session_state.question_order = []
     st.session_state.option_orders = {}
+    st.session_state.shuffled_options_cache = {}
     st.session_state.answers = {}
     st.session_state.start_time = None
     st.session_state.stats_updated = False
@@ -133,18 +168,27 @@ def init_state(selected_set, language, shuffle_questions, shuffle_options, usern
 def ensure_order_structures(questions):
     total = len(questions)
     if not st.session_state.question_order or len(st.session_state.question_order) != total:
-        order = list(range(total))
+        # random.sample vyrobí zamíchanou permutaci v jednom kroku
         if st.session_state.shuffle_questions:
-            random.shuffle(order)
+            order = random.sample(range(total), total)
+        else:
+            order = list(range(total))
         st.session_state.question_order = order
 
     for q in questions:
-        qid = (q["set"], q["id"], st.session_state.language)
+        qid = q["_qid_tuple"]
         if qid not in st.session_state.option_orders:
-            opt_order = list(range(len(q["options"])))
+            n_opts = len(q["options"])
             if st.session_state.shuffle_options:
-                random.shuffle(opt_order)
+                opt_order = random.sample(range(n_opts), n_opts)
+            else:
+                opt_order = list(range(n_opts))
             st.session_state.option_orders[qid] = opt_order
+            # zamíchané texty odpovědí spočítáme jednou tady, ať se
+            # list-comp neopakuje při každém překreslení otázky
+            st.session_state.shuffled_options_cache[qid] = [
+                q["options"][i] for i in opt_order
+            ]
 
 
 def show_user_stats(username: str):
@@ -153,33 +197,50 @@ def show_user_stats(username: str):
 
     stats = load_stats()
     user = stats.get(username)
-    if not user or "questions" not in user or not user["questions"]:
+    if not user or not user.get("seen"):
         st.info("Zatím nemáš nasbírané žádné statistiky. Zkus si udělat pár testů 🙂")
         return
 
-    q_stats = user["questions"]
+    seen_map = user["seen"]
+    correct_map = user["correct"]
 
-    # Přehled celkem
-    total_seen = 0
-    total_correct = 0
-    by_lang_set = {}  # (lang, set) -> {seen, correct}
+    # Klíče rozparsujeme jedním průchodem, agregace pak běží vektorově
+    # v numpy místo po jednotlivých otázkách v Pythonu
+    parsed = []  # (lang, set, qid)
+    seen_list = []
+    correct_list = []
 
-    for key, rec in q_stats.items():
+    for key, seen_count in seen_map.items():
         # key: "Čeština:A:1" nebo "English:B:5"
         try:
             lang, s, qid = key.split(":")
         except ValueError:
             continue
+        parsed.append((lang, s, qid))
+        seen_list.append(seen_count)
+        correct_list.append(correct_map.get(key, 0))
 
-        seen = rec.get("seen", 0)
-        correct = rec.get("correct", 0)
+    seen = np.asarray(seen_list, dtype=np.int64)
+    correct = np.asarray(correct_list, dtype=np.int64)
 
-        total_seen += seen
-        total_correct += correct
+    total_seen = int(seen.sum())
+    total_correct = int(correct.sum())
 
-        grp = by_lang_set.setdefault((lang, s), {"seen": 0, "correct": 0})
-        grp["seen"] += seen
-        grp["correct"] += correct
+    rates = correct / np.maximum(seen, 1)
+    weak_mask = (seen > 0) & (rates < 0.7)  # slabé (<70 %)
+    weak = []
+    for i in np.flatnonzero(weak_mask):
+        lang, s, qid = parsed[i]
+        weak.append(
+            {
+                "Jazyk": lang,
+                "Sada": s,
+                "ID otázky": int(qid),
+                "Odpovědí": int(seen[i]),
+                "Správně": int(correct[i]),
+                "Úspěšnost %": round(float(rates[i]) * 100, 1),
+            }
+        )
 
     if total_seen == 0:
         st.info("Máš statistiky, ale všude 'seen = 0'. Něco je špatně – dej vědět :)")
@@ -191,46 +252,30 @@ def show_user_stats(username: str):
     st.write(f"- Správných odpovědí: **{total_correct}**")
     st.write(f"- Celková úspěšnost: **{overall_rate:.1f} %**")
 
-    # Tabulka podle jazyk + sada
+    # Tabulka podle jazyk + sada – sečteme přes np.bincount podle skupin
     st.subheader("Podle jazyka a sady")
+    groups = np.array([f"{lang}:{s}" for lang, s, _ in parsed])
+    uniq_groups, group_idx = np.unique(groups, return_inverse=True)
+    grp_seen = np.bincount(group_idx, weights=seen).astype(np.int64)
+    grp_correct = np.bincount(group_idx, weights=correct).astype(np.int64)
+
     rows = []
-    for (lang, s), rec in sorted(by_lang_set.items()):
-        seen = rec["seen"]
-        correct = rec["correct"]
-        rate = correct / seen * 100 if seen > 0 else 0.0
+    for g, g_seen, g_correct in zip(uniq_groups, grp_seen, grp_correct):
+        lang, s = g.split(":")
+        rate = g_correct / g_seen * 100 if g_seen > 0 else 0.0
         rows.append(
             {
                 "Jazyk": lang,
                 "Sada": s,
-                "Odpovědí celkem": seen,
-                "Správně": correct,
-                "Úspěšnost %": round(rate, 1),
+                "Odpovědí celkem": int(g_seen),
+                "Správně": int(g_correct),
+                "Úspěšnost %": round(float(rate), 1),
             }
         )
     st.table(rows)
 
     # Nejslabší otázky
     st.subheader("Nejslabší otázky")
-    weak = []
-    for key, rec in q_stats.items():
-        seen = rec.get("seen", 0)
-        correct = rec.get("correct", 0)
-        if seen == 0:
-            continue
-        rate = correct / seen
-        if rate < 0.7:  # slabé (<70 %)
-            lang, s, qid = key.split(":")
-            weak.append(
-                {
-                    "Jazyk": lang,
-                    "Sada": s,
-                    "ID otázky": int(qid),
-                    "Odpovědí": seen,
-                    "Správně": correct,
-                    "Úspěšnost %": round(rate * 100, 1),
-                }
-            )
-
     if not weak:
         st.info("Nemáš žádné výrazně slabé otázky (pod 70 % úspěšnosti). Nice! 🎉")
     else:
@@ -262,7 +307,7 @@ def main():
     language = st.sidebar.selectbox("Jazyk / Language", list(LANG_FILES.keys()))
     questions_file = LANG_FILES[language]
 
-    sets = load_questions(questions_file)
+    sets = load_questions(questions_file, language)
     if not sets:
         st.error(f"Soubor s otázkami '{questions_file}' nebyl nalezen nebo je prázdný.")
         st.stop()
@@ -335,7 +380,7 @@ def main():
     q_index = order[pos]
     question = questions[q_index]
 
-    qid = (question["set"], question["id"], st.session_state.language)
+    qid = question["_qid_tuple"]
 
     st.markdown(
         f"**Otázka {pos + 1}/{total_questions} "
@@ -348,7 +393,7 @@ def main():
         st.info(f"Čas: {elapsed // 60:02d}:{elapsed % 60:02d}")
 
     opt_order = st.session_state.option_orders[qid]
-    shuffled_options = [question["options"][i] for i in opt_order]
+    shuffled_options = st.session_state.shuffled_options_cache[qid]
 
     prev_original_index = st.session_state.answers.get(qid, None)
     if prev_original_index is not None:
@@ -359,14 +404,16 @@ def main():
     else:
         prev_shuffled_index = 0
 
-    selected_option = st.radio(
+    # radio pracuje s indexy – vrací rovnou pozici v zamíchaném pořadí
+    # a nerozbije se na dvou stejných textech odpovědí
+    selected_shuffled_index = st.radio(
         "Vyber odpověď:",
-        shuffled_options,
+        options=list(range(len(shuffled_options))),
+        format_func=lambda i: shuffled_options[i],
         index=prev_shuffled_index,
         key=f"q_{qid}",
     )
 
-    selected_shuffled_index = shuffled_options.index(selected_option)
     original_index = opt_order[selected_shuffled_index]
     st.session_state.answers[qid] = original_index
 
@@ -400,8 +447,7 @@ def show_results(questions):
         st.session_state.stats_updated = True
 
     for q in questions:
-        qid = (q["set"], q["id"], st.session_state.language)
-        user_answer_index = st.session_state.answers.get(qid, None)
+        user_answer_index = st.session_state.answers.get(q["_qid_tuple"], None)
         correct_index = q["correct_index"]
 
         if user_answer_index == correct_index: